@@ -23,6 +23,7 @@ and SQL database
 """
 import sys
 from flask import Flask
+from flask_orjson import OrjsonProvider
 from service import config
 from service.common import log_handlers
 
@@ -33,6 +34,9 @@ from service.common import log_handlers
 # Create the Flask aoo
 app = Flask(__name__)  # pylint: disable=invalid-name
 
+# Serialize JSON responses with orjson instead of the stdlib json module
+app.json = OrjsonProvider(app)
+
 # Load Configurations
 app.config.from_object(config)
 
@@ -15,6 +15,14 @@ SQLALCHEMY_DATABASE_URI = DATABASE_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 # SQLALCHEMY_POOL_SIZE = 2
 
+# Number of serialized products to keep in memory for reads (0 disables it)
+# Each worker process keeps its own cache and only sees the writes it handles
+# itself, so this serves stale products whenever anything else writes to the
+# database: other workers (the Procfile and Dockerfile run two), other
+# services, or manual changes. Only enable it for a single worker that is the
+# sole writer
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "0"))
+
 # Secret for session management
 SECRET_KEY = os.getenv("SECRET_KEY", "sup3r-s3cr3t")
 LOGGING_LEVEL = logging.INFO
@@ -133,12 +133,13 @@ class Product(db.Model):
             self.name = data["name"]
             self.description = data["description"]
             self.price = Decimal(data["price"])
-            if isinstance(data["available"], bool):
-                self.available = data["available"]
+            available = data["available"]
+            if type(available) is bool:  # pylint: disable=unidiomatic-typecheck
+                self.available = available
             else:
                 raise DataValidationError(
                     "Invalid type for boolean [available]: "
-                    + str(type(data["available"]))
+                    + str(type(available))
                 )
             self.category = getattr(Category, data["category"])  # create enum from string
         except AttributeError as error:
@@ -173,7 +174,21 @@ class Product(db.Model):
     def all(cls) -> list:
         """Returns all of the Products in the database"""
         logger.info("Processing all Products")
-        return cls.query.all()
+        return cls.query.order_by(cls.id).all()
+
+    @classmethod
+    def iter_all(cls, batch_size: int = 100):
+        """Returns an iterator over all of the Products in the database
+
+        :param batch_size: the number of Products to fetch from the database at a time
+        :type batch_size: int
+
+        :return: an iterator of all Products, loaded in batches
+        :rtype: Query
+
+        """
+        logger.info("Processing all Products in batches of %s", batch_size)
+        return cls.query.order_by(cls.id).yield_per(batch_size)
 
     @classmethod
     def find(cls, product_id: int):
@@ -201,7 +216,7 @@ class Product(db.Model):
 
         """
         logger.info("Processing name query for %s ...", name)
-        return cls.query.filter(cls.name == name)
+        return cls.query.filter(cls.name == name).order_by(cls.id)
 
     @classmethod
     def find_by_price(cls, price: Decimal) -> list:
@@ -218,7 +233,7 @@ class Product(db.Model):
         price_value = price
         if isinstance(price, str):
             price_value = Decimal(price.strip(' "'))
-        return cls.query.filter(cls.price == price_value)
+        return cls.query.filter(cls.price == price_value).order_by(cls.id)
 
     @classmethod
     def find_by_availability(cls, available: bool = True) -> list:
@@ -232,7 +247,7 @@ class Product(db.Model):
 
         """
         logger.info("Processing available query for %s ...", available)
-        return cls.query.filter(cls.available == available)
+        return cls.query.filter(cls.available == available).order_by(cls.id)
 
     @classmethod
     def find_by_category(cls, category: Category = Category.UNKNOWN) -> list:
@@ -246,4 +261,4 @@ class Product(db.Model):
 
         """
         logger.info("Processing category query for %s ...", category.name)
-        return cls.query.filter(cls.category == category)
+        return cls.query.filter(cls.category == category).order_by(cls.id)
@@ -19,12 +19,13 @@
 Product Store Service with UI
 """
 from decimal import Decimal
-from dataclasses import dataclass
-from typing import Iterable, Callable, Any, Optional
+from functools import lru_cache
+from typing import Iterable, Optional
 
-from flask import jsonify, request, abort
+import orjson
+from flask import Response, jsonify, request, abort, stream_with_context
 from flask import url_for  # noqa: F401 pylint: disable=unused-import
-from service.models import Product, Category
+from service.models import Product, Category, DataValidationError
 from service.common import status  # HTTP Status Codes
 from . import app
 
@@ -52,23 +53,44 @@ def index():
 ######################################################################
 def check_content_type(content_type):
     """Checks that the media type is correct"""
-    if "Content-Type" not in request.headers:
+    request_type = request.headers.get("Content-Type")
+    if request_type is None:
         app.logger.error("No Content-Type specified.")
         abort(
             status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             f"Content-Type must be {content_type}",
         )
 
-    if request.headers["Content-Type"] == content_type:
+    if request_type == content_type:
         return
 
-    app.logger.error("Invalid Content-Type: %s", request.headers["Content-Type"])
+    app.logger.error("Invalid Content-Type: %s", request_type)
     abort(
         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
         f"Content-Type must be {content_type}",
     )
 
 
+def parse_json_body():
+    """Parses the request body as JSON"""
+    if not request.is_json:
+        raise DataValidationError("Invalid JSON body: Content-Type must be application/json")
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError as error:
+        raise DataValidationError("Invalid JSON body: " + str(error)) from error
+
+
+_CAT_MEMBERS = Category.__members__
+
+
+# bounded so arbitrary bad names from query strings can't grow the cache
+@lru_cache(maxsize=64)
+def _parse_category(name: str) -> Optional[Category]:
+    """Resolves a category name to its Category, or None if it is not valid"""
+    return _CAT_MEMBERS.get(name)
+
+
 ######################################################################
 # C R E A T E   A   N E W   P R O D U C T
 ######################################################################
@@ -81,7 +103,7 @@ def create_products():
     app.logger.info("Request to Create a Product...")
     check_content_type("application/json")
 
-    data = request.get_json()
+    data = parse_json_body()
     app.logger.info("Processing: %s", data)
     product = Product()
     product.deserialize(data)
@@ -100,104 +122,112 @@ def create_products():
 ######################################################################
 # L I S T   A L L   P R O D U C T S
 ######################################################################
-@dataclass
-class ResponseError:
-    """Stores response errors to differentiate them from product iterators"""
-    body: str
-    status: int = status.HTTP_400_BAD_REQUEST
+_AVAIL_MAP = {"true": True, "false": False}
+
+# query parameter -> (parser, finder, error message)
+# parsers return None when a query value is not valid for its filter
+FILTERS = {
+    "name": (lambda name: name or None, Product.find_by_name, "name must not be empty"),
+    "category": (_parse_category, Product.find_by_category, "category '{}' is not valid"),
+    "available": (_AVAIL_MAP.get, Product.find_by_availability, "available value '{}' is not true or false"),
+}
 
-    def as_response(self):
-        """Returns a tuple that can be used as a server response"""
-        return (self.body, self.status)
 
+def stream_products(products: Iterable[Product]) -> Response:
+    """Streams products as a JSON array, encoding one product at a time"""
+    serialize = Product.serialize
 
-def filter_by_name(name: str) -> Iterable[Product]:
-    """Validates raw_names, then filters products by them"""
-    if name == "":
-        return ResponseError(
-            body="name must not be empty",
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+    def generate():
+        yield b"["
+        separator = b""
+        for product in products:
+            yield separator + orjson.dumps(serialize(product))
+            separator = b","
+        yield b"]"
 
-    return Product.find_by_name(name)
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 
-def filter_by_category(category: str) -> Iterable[Product]:
-    """Validates raw_categories, then filters products by them"""
-    if category not in Category.__members__:
-        return ResponseError(
-            body=f"category '{category}' is not valid",
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+@app.route("/products", methods=["GET"])
+def list_products():
+    """Responds with a list of products filterable by query"""
+    args = request.args
+    for key in args:
+        query_filter = FILTERS.get(key)
+        if query_filter is None:
+            continue
 
-    return Product.find_by_category(Category[category])
+        parse, find, error = query_filter
+        value = args[key]
+        parsed = parse(value)
+        if parsed is None:
+            return (error.format(value), status.HTTP_400_BAD_REQUEST)
 
+        return stream_products(find(parsed))
 
-def filter_by_availability(available: str) -> Iterable[Product]:
-    """Validates raw_availabilities, then filters products by them"""
-    if available not in ("true", "false"):
-        return ResponseError(
-            body=f"available value '{available}' is not true or false",
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    return stream_products(Product.iter_all())
 
-    return Product.find_by_availability(available == "true")
 
+######################################################################
+# R E A D   A   P R O D U C T
+######################################################################
+# product id -> serialized product, ordered from least to most recently used
+_product_cache = {}
+# product id -> number of writes, so a read that a write overtook isn't stored
+_product_writes = {}
 
-filters = (
-    ("name", filter_by_name),
-    ("category", filter_by_category),
-    ("available", filter_by_availability),
-)
 
+def record_product_write(product_id: int):
+    """Drops a product from the cache after it has been updated or deleted"""
+    _product_writes[product_id] = _product_writes.get(product_id, 0) + 1
+    _product_cache.pop(product_id, None)
 
-@app.route("/products", methods=["GET"])
-def list_products():
-    """Responds with a list of products filterable by query"""
-    products = Product.all()
-    for key, filter_func in filters:
-        if key not in request.args:
-            continue
 
-        products = filter_func(request.args.get(key))
-        if isinstance(products, ResponseError):
-            return products.as_response()
+def find_product_cached(product_id: int) -> Optional[dict]:
+    """Returns the serialized product with product_id, or None if not found"""
+    cached = _product_cache.pop(product_id, None)
+    if cached is not None:
+        _product_cache[product_id] = cached
+        return cached
 
-        return [p.serialize() for p in products]
+    writes = _product_writes.get(product_id, 0)
+    product = Product.find(product_id)
+    if product is None:
+        return None  # misses are not cached so new products show up
 
-    return [p.serialize() for p in Product.all()]
+    serialized = product.serialize()
+    cache_size = app.config["PRODUCT_CACHE_SIZE"]
+    if cache_size > 0 and _product_writes.get(product_id, 0) == writes:
+        if len(_product_cache) >= cache_size:
+            del _product_cache[next(iter(_product_cache))]
+        _product_cache[product_id] = serialized
+    return serialized
 
 
-######################################################################
-# R E A D   A   P R O D U C T
-######################################################################
 @app.route("/products/<int:product_id>", methods=["GET"])
 def get_products(product_id: int):
     """Get product information"""
-    product = Product.find(product_id)
+    product = find_product_cached(product_id)
     if product is None:
         return ("product not found", status.HTTP_404_NOT_FOUND)
 
-    return product.serialize()
+    return product
 
 
 ######################################################################
 # U P D A T E   A   P R O D U C T
 ######################################################################
-@dataclass
-class Transform:
-    """Holds a validator and a converter together for a specific product field"""
-    matches: Callable[[Any], bool]
-    converts: Optional[Callable[[Any], Any]] = None
-
+# field tags for updateable product fields
+_FIELD_STR, _FIELD_BOOL, _FIELD_DEC, _FIELD_CAT = range(4)
 
 updateable = {
-    "name": Transform(matches=lambda x: isinstance(x, str)),
-    "description": Transform(matches=lambda x: isinstance(x, str)),
-    "available": Transform(matches=lambda x: isinstance(x, bool)),
-    "price": Transform(matches=lambda x: isinstance(x, str), converts=Decimal),
-    "category": Transform(matches=lambda x: x in Category.__members__, converts=Category.__getitem__),
+    "name": _FIELD_STR,
+    "description": _FIELD_STR,
+    "available": _FIELD_BOOL,
+    "price": _FIELD_DEC,
+    "category": _FIELD_CAT,
 }
+_UPDATEABLE_KEYS = frozenset(updateable)
 
 
 @app.route("/products/<int:product_id>", methods=["PUT"])
@@ -207,21 +237,32 @@ def update_product(product_id: int):
     if product is None:
         return ("product not found", status.HTTP_404_NOT_FOUND)
 
-    data = request.get_json()
+    data = parse_json_body()
     if len(data) <= 0:
         return ("body must be non-empty", status.HTTP_422_UNPROCESSABLE_ENTITY)
 
     for key, value in data.items():
-        transform = updateable.get(key)
-        if transform is None:
+        if key not in _UPDATEABLE_KEYS:
             return (f"key '{key}' is not a valid field", status.HTTP_422_UNPROCESSABLE_ENTITY)
-        if not transform.matches(value):
+        tag = updateable[key]
+
+        # converted is None whenever the value is invalid for its field
+        # pylint: disable=unidiomatic-typecheck
+        if tag == _FIELD_CAT:
+            converted = _parse_category(value)
+        elif tag == _FIELD_BOOL:
+            converted = value if type(value) is bool else None
+        elif type(value) is not str:
+            converted = None
+        else:
+            converted = Decimal(value) if tag == _FIELD_DEC else value
+
+        if converted is None:
             return (f"field '{key}' has an invalid value ({value})", status.HTTP_422_UNPROCESSABLE_ENTITY)
-
-        converted = value if transform.converts is None else transform.converts(value)
         setattr(product, key, converted)
 
     product.update()
+    record_product_write(product_id)
     return product.serialize()
 
 
@@ -236,4 +277,5 @@ def delete_product(product_id):
         return ("product not found", status.HTTP_404_NOT_FOUND)
 
     product.delete()
+    record_product_write(product_id)
     return ("", status.HTTP_204_NO_CONTENT)
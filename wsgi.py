@@ -0,0 +1,19 @@
+"""
+WSGI entry point for serving the application with gevent workers
+
+The gevent monkey-patching must run before anything else is imported so
+that sockets, and the PostgreSQL driver, yield to other requests while
+they wait on I/O.
+
+Usage: gunicorn --worker-class=gevent wsgi:application
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+# pylint: disable=wrong-import-position
+from psycogreen.gevent import patch_psycopg  # noqa: E402
+
+patch_psycopg()
+
+from service import app as application  # noqa: E402, F401 pylint: disable=unused-import